@@ -9,17 +9,20 @@ This script:
 4. Updates import statements across the entire codebase
 
 USAGE:
-    python3 refactor_pricing_package.py [--dry-run]
+    python3 refactor_pricing_package.py [--dry-run] [--quiet]
 
 OPTIONS:
     --dry-run  Show what would be done without making changes
+    --quiet    Only report totals when updating imports
 """
 
+import mmap
 import os
 import re
 import sys
 from pathlib import Path
-from collections import defaultdict
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 
 # Configuration
 BASE_DIR = Path(__file__).parent / "src/main/java/com/meatrics"
@@ -85,6 +88,18 @@ for domain, files in DOMAINS.items():
         classname = filename.replace(".java", "")
         CLASS_TO_DOMAIN[classname] = domain
 
+# Precompiled patterns (reused for every file processed)
+PACKAGE_RE = re.compile(r'^package\s+com\.meatrics\.pricing\s*;', re.MULTILINE)
+USED_CLASS_RE = re.compile(r'\b(' + '|'.join(re.escape(c) for c in CLASS_TO_DOMAIN) + r')\b')
+NEW_IMPORTS = {c: f"import com.meatrics.pricing.{d}.{c};" for c, d in CLASS_TO_DOMAIN.items()}
+IMPORT_RE = re.compile(
+    r'import com\.meatrics\.pricing\.('
+    + '|'.join(re.escape(c) for c in CLASS_TO_DOMAIN)
+    + r');'
+)
+# Import statement at the start of a line; the header ends after the last one
+IMPORT_LINE_RE = re.compile(r'^\s*import\s[^;]*;', re.MULTILINE)
+
 
 def print_header(text):
     """Print a formatted header"""
@@ -93,6 +108,41 @@ def print_header(text):
     print("=" * 80)
 
 
+def iter_java_files(root):
+    """Yield paths of all .java files under root using cached dirent types"""
+    stack = [os.fspath(root)]
+    while stack:
+        d = stack.pop()
+        with os.scandir(d) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.endswith(".java") and entry.is_file(follow_symlinks=False):
+                    yield entry.path
+
+
+def rewrite_specific_imports(content):
+    """Rewrite flat pricing imports with a single regex pass over content.
+
+    Returns the new content and the rewritten class names in order of first use.
+    """
+    found = []
+
+    def repl(m):
+        classname = m.group(1)
+        if classname not in found:
+            found.append(classname)
+        return NEW_IMPORTS[classname]
+
+    content = IMPORT_RE.sub(repl, content)
+    return content, found
+
+
+def collect_java_files():
+    """Walk BASE_DIR once and return every Java source path"""
+    return [Path(p) for p in iter_java_files(BASE_DIR)]
+
+
 def create_domain_packages(dry_run=False):
     """Create all domain sub-packages"""
     print("\nSTEP 1: Creating domain packages...")
@@ -125,23 +175,20 @@ def move_files_and_update_packages(dry_run=False):
                 moved_count += 1
             else:
                 # Read file
-                with open(source, 'r', encoding='utf-8') as f:
-                    content = f.read()
+                content = source.read_text(encoding='utf-8')
 
                 # Update package declaration
                 new_package = f"com.meatrics.pricing.{domain}"
-                content = re.sub(
-                    r'^package\s+com\.meatrics\.pricing\s*;',
-                    f'package {new_package};',
-                    content,
-                    flags=re.MULTILINE
-                )
-
-                # Write to new location
-                with open(dest, 'w', encoding='utf-8') as f:
-                    f.write(content)
-
-                # Remove old file
+                content = PACKAGE_RE.sub(f'package {new_package};', content)
+
+                # Write beside the destination, then atomically swap it in so dest
+                # is never seen half-written; the source is removed afterwards
+                tmp = dest.with_name(dest.name + ".tmp")
+                try:
+                    tmp.write_text(content, encoding='utf-8')
+                    os.replace(tmp, dest)
+                finally:
+                    tmp.unlink(missing_ok=True)
                 source.unlink()
 
                 print(f"  ✓ {filename}")
@@ -151,87 +198,124 @@ def move_files_and_update_packages(dry_run=False):
     return moved_count
 
 
-def update_imports(dry_run=False):
+def process_file(java_file_path):
+    """Rewrite pricing imports in a single Java file.
+
+    Runs in a worker process; returns (path, import count, changed, error).
+    Per-file failures are returned as the error message instead of being
+    raised, so one bad file doesn't abort the pool while other workers keep writing.
+    """
+    try:
+        return (java_file_path,) + rewrite_file_imports(Path(java_file_path)) + (None,)
+    except (OSError, ValueError) as e:
+        return java_file_path, 0, False, str(e)
+
+
+def rewrite_file_imports(java_file):
+    """Rewrite one file; returns (import count, changed)"""
+
+    # Cheap substring gate on the mapped file: nothing to rewrite without a
+    # pricing import, and negative files are never copied or decoded
+    with open(java_file, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return 0, False
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm.find(b"com.meatrics.pricing") < 0:
+                return 0, False
+
+    # Text mode, like moved files, so line endings are normalized consistently
+    original_content = java_file.read_text(encoding='utf-8')
+
+    file_import_count = 0
+
+    # Imports live in the header, so only rewrite up to the end of the last one
+    split_idx = len(original_content)
+    for m in IMPORT_LINE_RE.finditer(original_content):
+        split_idx = m.end()
+    head, tail = original_content[:split_idx], original_content[split_idx:]
+
+    # Update specific imports for each class
+    head, rewritten = rewrite_specific_imports(head)
+    file_import_count += len(rewritten)
+
+    # Handle wildcard imports
+    if "import com.meatrics.pricing.*;" in head:
+        # Find which classes are used (simple check if class name appears in the file)
+        used_classes = {m.group(1) for m in USED_CLASS_RE.finditer(head)}
+        used_classes.update(m.group(1) for m in USED_CLASS_RE.finditer(tail))
+
+        if used_classes:
+            # Build new imports
+            new_imports = [NEW_IMPORTS[classname] for classname in sorted(used_classes)]
+
+            # Replace wildcard with specific imports
+            head = head.replace(
+                "import com.meatrics.pricing.*;",
+                "\n".join(new_imports)
+            )
+            file_import_count += len(new_imports)
+
+    # Write back if changed
+    content = head + tail
+    changed = content != original_content
+    if changed:
+        java_file.write_text(content, encoding='utf-8')
+
+    return file_import_count, changed
+
+
+def update_imports(java_files, dry_run=False, quiet=False):
     """Update imports across all Java files"""
     print("\nSTEP 3: Updating imports across codebase...")
 
     files_updated = 0
     imports_updated = 0
-    import_details = defaultdict(list)
+    files_failed = 0
 
-    for java_file in BASE_DIR.rglob("*.java"):
-        # Skip files we just moved (they're in new locations now)
-        rel_path = java_file.relative_to(BASE_DIR)
+    if dry_run:
+        # In dry-run, files haven't been moved yet
+        return files_updated, imports_updated
+
+    # Files are independent, so rewrite them across all cores
+    with ProcessPoolExecutor() as ex:
+        for java_file_path, file_import_count, changed, error in ex.map(
+                process_file, java_files, chunksize=16):
+            if error is not None:
+                files_failed += 1
+                rel_path = Path(java_file_path).relative_to(BASE_DIR)
+                print(f"  ✗ {rel_path}: {error}")
+                continue
 
-        if dry_run:
-            # In dry-run, files haven't been moved yet
-            continue
-
-        with open(java_file, 'r', encoding='utf-8') as f:
-            original_content = f.read()
-
-        content = original_content
-        file_import_count = 0
-
-        # Update specific imports for each class
-        for classname, domain in CLASS_TO_DOMAIN.items():
-            old_import = f"import com.meatrics.pricing.{classname};"
-            new_import = f"import com.meatrics.pricing.{domain}.{classname};"
-
-            if old_import in content:
-                content = content.replace(old_import, new_import)
-                file_import_count += 1
-                import_details[str(rel_path)].append(f"{classname} -> {domain}")
-
-        # Handle wildcard imports
-        if "import com.meatrics.pricing.*;" in content:
-            # Find which classes are used
-            used_classes = set()
-            for classname in CLASS_TO_DOMAIN.keys():
-                # Simple check if class name appears in the file
-                if re.search(r'\b' + classname + r'\b', content):
-                    used_classes.add(classname)
-
-            if used_classes:
-                # Build new imports
-                new_imports = []
-                for classname in sorted(used_classes):
-                    domain = CLASS_TO_DOMAIN[classname]
-                    new_imports.append(f"import com.meatrics.pricing.{domain}.{classname};")
-
-                # Replace wildcard with specific imports
-                content = content.replace(
-                    "import com.meatrics.pricing.*;",
-                    "\n".join(new_imports)
-                )
-                file_import_count += len(new_imports)
-                import_details[str(rel_path)].append(f"Wildcard -> {len(new_imports)} specific imports")
-
-        # Write back if changed
-        if content != original_content:
-            if not dry_run:
-                with open(java_file, 'w', encoding='utf-8') as f:
-                    f.write(content)
+            if not changed:
+                continue
 
             files_updated += 1
             imports_updated += file_import_count
+            if quiet:
+                continue
+
+            rel_path = Path(java_file_path).relative_to(BASE_DIR)
             print(f"  ✓ {rel_path} ({file_import_count} imports)")
 
     print(f"\nFiles with updated imports: {files_updated}")
     print(f"Total imports updated: {imports_updated}")
+    if files_failed:
+        print(f"⚠ Files that could not be updated: {files_failed}")
     return files_updated, imports_updated
 
 
-def verify_structure():
+def verify_structure(java_files):
     """Verify the new directory structure"""
     print("\nVERIFYING STRUCTURE:")
     print(f"  {PRICING_DIR.name}/")
 
+    files_per_dir = Counter(f.parent for f in java_files)
+
     total_files = 0
     for domain in sorted(DOMAINS.keys()):
         domain_path = PRICING_DIR / domain
         if domain_path.exists():
-            file_count = len(list(domain_path.glob("*.java")))
+            file_count = files_per_dir[domain_path]
             total_files += file_count
             print(f"    ├── {domain}/ ({file_count} files)")
         else:
@@ -240,13 +324,13 @@ def verify_structure():
     # Count UI files separately
     ui_path = PRICING_DIR / "ui"
     if ui_path.exists():
-        ui_file_count = len(list(ui_path.rglob("*.java")))
+        ui_file_count = sum(1 for f in java_files if ui_path in f.parents)
         print(f"    └── ui/ ({ui_file_count} files)")
 
     print(f"\n  Total domain files: {total_files}")
 
 
-def print_summary(moved_count, files_updated, imports_updated):
+def print_summary(java_files, moved_count, files_updated, imports_updated):
     """Print final summary"""
     print_header("REFACTORING COMPLETE")
 
@@ -254,7 +338,7 @@ def print_summary(moved_count, files_updated, imports_updated):
     print(f"Files with import statements updated: {files_updated}")
     print(f"Total import statements updated: {imports_updated}")
 
-    verify_structure()
+    verify_structure(java_files)
 
     print("\nNext steps:")
     print("  1. Verify compilation: mvn compile")
@@ -266,6 +350,7 @@ def print_summary(moved_count, files_updated, imports_updated):
 def main():
     """Main execution function"""
     dry_run = "--dry-run" in sys.argv
+    quiet = "--quiet" in sys.argv
 
     print_header("PRICING PACKAGE REFACTORING")
     print(f"Mode: {'DRY-RUN (no changes will be made)' if dry_run else 'LIVE (changes will be applied)'}")
@@ -289,8 +374,9 @@ def main():
     moved_count = move_files_and_update_packages(dry_run)
 
     if not dry_run:
-        files_updated, imports_updated = update_imports(dry_run)
-        print_summary(moved_count, files_updated, imports_updated)
+        java_files = collect_java_files()
+        files_updated, imports_updated = update_imports(java_files, dry_run, quiet)
+        print_summary(java_files, moved_count, files_updated, imports_updated)
     else:
         print("\n[DRY-RUN] To execute, run without --dry-run flag")
 